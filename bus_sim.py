@@ -3,11 +3,14 @@ Public Transportation Network Simulation
 Assignment: Performance Modeling and Evaluation
 """
 
-import simpy
-import random
+import argparse
+import collections
+import csv
+import heapq
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 from prettytable import PrettyTable  # pip install prettytable
 
 # -----------------------
@@ -16,6 +19,7 @@ from prettytable import PrettyTable  # pip install prettytable
 RANDOM_SEED = 42
 SIM_HOURS = 8
 SIM_TIME = SIM_HOURS * 60  # minutes
+NUM_REPLICATIONS = 20      # independent runs for the replication summary
 
 BUS_CAPACITY = 40
 BOARDING_TIME = 3 / 60       # 3 seconds per passenger
@@ -31,177 +35,391 @@ ROUTES = {
 # Passenger arrival rates (per minute)
 ARRIVAL_RATES = {"A1": 0.35, "A2": 0.25, "A3": 0.20, "B1": 0.40, "B2": 0.30, "B3": 0.22}
 
+# Small integer codes for stops and routes; per-stop statistics are arrays indexed by these
+STOP_NAMES = [s for r in ROUTES.values() for s in r["stops"]]
+STOP_IDX = {name: i for i, name in enumerate(STOP_NAMES)}
+ROUTE_NAMES = list(ROUTES)
+ROUTE_IDX = {name: i for i, name in enumerate(ROUTE_NAMES)}
+
 # -----------------------
 # DATA COLLECTION
 # -----------------------
-metrics = {
-    "waiting_times": [],
-    "passenger_records": [],
-    "queue_time_series": {},
-    "bus_stats": {},
-    "served_per_stop": {}
-}
+# One fixed-size row per boarded passenger; bus is the index from SimState.add_bus()
+PASSENGER_DT = np.dtype([("arrival", "f4"), ("board", "f4"), ("alight", "f4"), ("origin", "i1"),
+                         ("dest", "i1"), ("route", "i1"), ("bus", "i1"), ("seq", "i4")])
+
+# All statistics of one run, passed explicitly to every entity
+@dataclass(slots=True)
+class SimState:
+    waiting_times: np.ndarray = field(default_factory=lambda: np.empty(1024, dtype=np.float64))   # grown 2x when full
+    wt_n: int = 0
+    records: np.ndarray = field(default_factory=lambda: np.empty(1024, dtype=PASSENGER_DT))   # grown 2x when full
+    rec_n: int = 0
+    # Queue lengths sampled once a minute: shared time grid, one row per stop code
+    queue_times: np.ndarray = field(default_factory=lambda: np.arange(SIM_TIME, dtype=np.int32))
+    queue_lens: np.ndarray = field(default_factory=lambda: np.zeros((len(STOP_NAMES), SIM_TIME), dtype=np.int16))
+    # Per-bus statistics, indexed by the integer handed out by add_bus()
+    bus_ids: list = field(default_factory=list)
+    bus_routes: list = field(default_factory=list)
+    bus_active: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    bus_occupied: np.ndarray = field(default_factory=lambda: np.zeros(0))
+    bus_trips: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    served_per_stop: np.ndarray = field(default_factory=lambda: np.zeros(len(STOP_NAMES), dtype=np.int32))
+    replication: int | None = None   # set by run_once() for replication runs
+
+    def add_bus(self, bus_id, route_name):
+        self.bus_ids.append(bus_id)
+        self.bus_routes.append(route_name)
+        self.bus_active = np.append(self.bus_active, 0.0)
+        self.bus_occupied = np.append(self.bus_occupied, 0.0)
+        self.bus_trips = np.append(self.bus_trips, 0)
+        return len(self.bus_ids) - 1
+
+    def record_wait(self, wait):
+        n = self.wt_n
+        if n == len(self.waiting_times):
+            self.waiting_times = np.resize(self.waiting_times, 2*n)
+        self.waiting_times[n] = wait
+        self.wt_n = n + 1
+
+    def record_passenger(self, p, route_code, bus_idx):
+        n = self.rec_n
+        if n == len(self.records):
+            self.records = np.resize(self.records, 2*n)
+        self.records[n] = (p.arrival_time, p.board_time, np.nan, p.origin, p.destination,
+                           route_code, bus_idx, p.seq)
+        self.rec_n = n + 1
+        return n
+
+    # Passenger records decoded to CSV columns
+    def passenger_columns(self):
+        rec = self.records[:self.rec_n]
+        origin = np.array(STOP_NAMES)[rec["origin"]]
+        return {"id": np.char.add(np.char.add(origin, "-"), rec["seq"].astype(str)), "origin": origin,
+                "destination": np.array(STOP_NAMES)[rec["dest"]], "arrival": rec["arrival"],
+                "board": rec["board"], "alight": rec["alight"],
+                "route": np.array(ROUTE_NAMES)[rec["route"]], "bus": np.array(self.bus_ids)[rec["bus"]]}
+
+# -----------------------
+# EVENT LOOP
+# -----------------------
+# Event kinds; each event is a (time, seq, kind, entity) tuple on the heap
+BUS_ARRIVE, BUS_BOARD, BUS_DEPART, PASSENGER_ARRIVE, SAMPLE = range(5)
+
+class EventLoop:
+    def __init__(self):
+        self.now = 0.0
+        self.fel = []                # future event list
+        self.seq = itertools.count() # FIFO tie-break for simultaneous events
+
+    def schedule(self, delay, kind, entity):
+        heapq.heappush(self.fel, (self.now + delay, next(self.seq), kind, entity))
+
+    # Process events strictly before `until`, handing each to its handler
+    def run(self, until):
+        fel, pop = self.fel, heapq.heappop
+        while fel and fel[0][0] < until:
+            t, _, kind, entity = pop(fel)
+            self.now = t
+            DISPATCH[kind](entity, t)
+        self.now = until
 
 # -----------------------
 # ENTITY CLASSES
 # -----------------------
 class Passenger:
-    def __init__(self, pid, arrival_time, origin, destination):
-        self.id = pid
+    def __init__(self, seq, arrival_time, origin, destination):
+        self.seq = seq   # per-stop sequence number; the id is "<origin>-<seq>"
         self.arrival_time = arrival_time
-        self.origin = origin
+        self.origin = origin             # stop codes from STOP_IDX
         self.destination = destination
         self.board_time = None
         self.alight_time = None
+        self.record = None   # row in SimState.records once boarded
 
 class Stop:
     def __init__(self, env, name):
         self.env = env
         self.name = name
-        self.queue = simpy.Store(env)
+        self.idx = STOP_IDX[name]
+        self.queue = collections.deque()
+        self.q_len = 0   # kept in step with the queue so the monitor just reads it
 
     def add_passenger(self, passenger):
-        return self.queue.put(passenger)
+        self.queue.append(passenger)
+        self.q_len += 1
 
     def get_passenger(self):
-        return self.queue.get()
+        self.q_len -= 1
+        return self.queue.popleft()
 
+# Bus cycle: arrive -> alight -> board -> dwell -> depart -> travel -> arrive
 class Bus:
-    def __init__(self, env, bus_id, route_name, stops, route_info, start_time=0):
+    def __init__(self, env, bus_id, route_name, stops, route_info, rng, state, start_time=0):
         self.env = env
+        self.state = state
+        self.idx = state.add_bus(bus_id, route_name)
+        self.gauss = rng.normal
         self.id = bus_id
         self.route_name = route_name
+        self.route_code = ROUTE_IDX[route_name]
         self.stops = stops
         self.route_info = route_info
         self.capacity = BUS_CAPACITY
         self.onboard = []
         self.current_index = 0
+        self.next_index = list(range(1, len(stops))) + [0]   # stop after each stop, wrapping to 0
+        self.in_transit = False
+        self.alighted = 0
         self.active_minutes = 0
         self.occupied_minutes = 0
         self.trips_completed = 0
-        metrics["bus_stats"][self.id] = {"active_minutes":0, "occupied_minutes":0, "trips_completed":0}
-        self.env.process(self.run(start_time))
-
-    def run(self, start_time):
-        yield self.env.timeout(start_time)
-        while True:
-            stop = self.stops[self.current_index]
-
-            # Alighting passengers
-            alighting = [p for p in self.onboard if p.destination == stop.name]
-            for p in alighting:
-                p.alight_time = self.env.now
-                self.onboard.remove(p)
-            if alighting:
-                yield self.env.timeout(len(alighting)*ALIGHTING_TIME)
-
-            # Boarding passengers
-            free_space = self.capacity - len(self.onboard)
-            boarded = 0
-            while free_space > 0 and len(stop.queue.items) > 0:
-                p = yield stop.get_passenger()
-                p.board_time = self.env.now
-                metrics["waiting_times"].append(p.board_time - p.arrival_time)
-                self.onboard.append(p)
-                metrics["passenger_records"].append({
-                    "id":p.id, "origin":p.origin, "destination":p.destination,
-                    "arrival":p.arrival_time, "board":p.board_time, "alight":p.alight_time,
-                    "route":self.route_name, "bus":self.id
-                })
-                # Count per stop
-                if stop.name not in metrics["served_per_stop"]:
-                    metrics["served_per_stop"][stop.name] = 0
-                metrics["served_per_stop"][stop.name] += 1
-
-                boarded +=1
-                free_space -=1
-                yield self.env.timeout(BOARDING_TIME)
-
-            # Minimum dwell if no boarding/alighting
-            if boarded==0 and len(alighting)==0:
-                yield self.env.timeout(MIN_DWELL)
-
-            # Travel to next stop
-            travel_time = max(0.5, random.gauss(self.route_info["travel_mean"], self.route_info["travel_sd"]))
-            t = travel_time
-            while t>0:
-                step = min(1, t)
-                self.active_minutes += step
-                self.occupied_minutes += len(self.onboard)*step
-                metrics["bus_stats"][self.id]["active_minutes"] += step
-                metrics["bus_stats"][self.id]["occupied_minutes"] += len(self.onboard)*step
-                yield self.env.timeout(step)
-                t -= step
-
-            # Move to next stop
-            self.current_index = (self.current_index + 1) % len(self.stops)
+        self.env.schedule(start_time, BUS_ARRIVE, self)
+
+    def arrive(self, now):
+        # Move to next stop
+        if self.in_transit:
+            self.in_transit = False
+            self.current_index = self.next_index[self.current_index]
             if self.current_index==0:
                 self.trips_completed +=1
-                metrics["bus_stats"][self.id]["trips_completed"] +=1
+                self.state.bus_trips[self.idx] +=1
+        stop = self.stops[self.current_index]
+
+        # Alighting passengers
+        alighting = []
+        new_onboard = []
+        alight_col = self.state.records["alight"]
+        for p in self.onboard:
+            if p.destination == stop.idx:
+                p.alight_time = now
+                alight_col[p.record] = now
+                alighting.append(p)
+            else:
+                new_onboard.append(p)
+        self.onboard = new_onboard
+        self.alighted = len(alighting)
+        if alighting:
+            self.env.schedule(len(alighting)*ALIGHTING_TIME, BUS_BOARD, self)
+        else:
+            self.board(now)
+
+    def board(self, now):
+        state = self.state
+        stop = self.stops[self.current_index]
+
+        # Boarding passengers
+        free_space = self.capacity - len(self.onboard)
+        boarded = 0
+        queue = stop.queue
+        while free_space and queue:
+            p = stop.get_passenger()
+            p.board_time = now + boarded*BOARDING_TIME
+            state.record_wait(p.board_time - p.arrival_time)
+            self.onboard.append(p)
+            p.record = state.record_passenger(p, self.route_code, self.idx)
+            # Count per stop
+            state.served_per_stop[stop.idx] += 1
+
+            boarded +=1
+            free_space -=1
+
+        # One dwell for the whole boarding group, or the minimum dwell if nobody moved
+        if boarded:
+            self.env.schedule(boarded*BOARDING_TIME, BUS_DEPART, self)
+        elif self.alighted==0:
+            self.env.schedule(MIN_DWELL, BUS_DEPART, self)
+        else:
+            self.depart(now)
+
+    def depart(self, now):
+        # Travel to next stop
+        travel_time = max(0.5, self.gauss(self.route_info["travel_mean"], self.route_info["travel_sd"]))
+        # Occupancy is constant while travelling, so account for the whole leg at once
+        occupied = len(self.onboard)*travel_time
+        self.active_minutes += travel_time
+        self.occupied_minutes += occupied
+        self.state.bus_active[self.idx] += travel_time
+        self.state.bus_occupied[self.idx] += occupied
+        self.in_transit = True
+        self.env.schedule(travel_time, BUS_ARRIVE, self)
 
 # -----------------------
 # PASSENGER GENERATOR
 # -----------------------
-def passenger_generator(env, stop, rate, route_stops):
-    pid = 0
-    while True:
-        interarrival = np.random.exponential(1/rate)
-        yield env.timeout(interarrival)
-        pid +=1
-        idx = route_stops.index(stop.name)
-        dest = random.choice(route_stops[idx+1:]) if idx+1<len(route_stops) else stop.name
-        p = Passenger(f"{stop.name}-{pid}", env.now, stop.name, dest)
-        stop.add_passenger(p)
+class PassengerSource:
+    def __init__(self, env, stop, rate, route_stops, rng):
+        # Everything that is fixed for this stop is bound once
+        self.env = env
+        self.expo, self.choice = rng.exponential, rng.integers
+        self.add = stop.add_passenger
+        self.code = stop.idx
+        self.tail_codes = np.array([STOP_IDX[s] for s in route_stops[route_stops.index(stop.name)+1:]])
+        self.inv_rate = 1.0/rate
+        self.pid = 0
+        # Inter-arrival times and destinations are drawn in batches sized to cover
+        # the run; another batch is drawn if the horizon has not been reached yet
+        self.n_est = int(rate * SIM_TIME * 1.3) + 1
+        self.refill()
+        self.env.schedule(self.dts[0], PASSENGER_ARRIVE, self)
+
+    def refill(self):
+        self.i = 0
+        self.dts = self.expo(self.inv_rate, size=self.n_est).tolist()
+        if not len(self.tail_codes):
+            self.dests = [self.code]*self.n_est
+        else:
+            tail = self.tail_codes
+            self.dests = tail[self.choice(0, len(tail), size=self.n_est)].tolist()
+
+    def arrive(self, now):
+        self.pid +=1
+        self.add(Passenger(self.pid, now, self.code, self.dests[self.i]))
+        self.i += 1
+        if self.i == self.n_est:
+            self.refill()
+        self.env.schedule(self.dts[self.i], PASSENGER_ARRIVE, self)
 
 # -----------------------
 # MONITOR QUEUES
 # -----------------------
-def monitor(env, stops):
-    while True:
-        for s in stops.values():
-            if s.name not in metrics["queue_time_series"]:
-                metrics["queue_time_series"][s.name]=[]
-            metrics["queue_time_series"][s.name].append((env.now, len(s.queue.items)))
-        yield env.timeout(1)
+class Monitor:
+    def __init__(self, env, stops, state):
+        self.env = env
+        self.lens = [(state.queue_lens[s.idx], s) for s in stops.values()]
+        self.env.schedule(0, SAMPLE, self)
+
+    def sample(self, now):
+        t = int(now)
+        for arr, s in self.lens:
+            arr[t] = s.q_len
+        self.env.schedule(1, SAMPLE, self)
+
+# Handler for each event kind, indexed by kind
+DISPATCH = (Bus.arrive, Bus.board, Bus.depart, PassengerSource.arrive, Monitor.sample)
+
+# -----------------------
+# SUMMARY STATISTICS
+# -----------------------
+# Average occupancy and utilization % for every bus in one vectorized pass
+def summarize_buses(active, occupied):
+    active = np.asarray(active, dtype=np.float64)
+    occupied = np.asarray(occupied, dtype=np.float64)
+    avg_occ = np.divide(occupied, active, out=np.zeros_like(active), where=active > 0)
+    return avg_occ, avg_occ / BUS_CAPACITY * 100
+
+# Write named columns straight to CSV; NaN floats become empty fields
+def write_csv(path, columns):
+    cols = []
+    for col in columns.values():
+        if isinstance(col, np.ndarray) and col.dtype.kind == "f":
+            text = col.astype(str)
+            text[np.isnan(col)] = ""
+            col = text
+        cols.append(col)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(zip(*cols))
 
 # -----------------------
 # SIMULATION SETUP
 # -----------------------
-def run_simulation():
-    env = simpy.Environment()
+# Simulate only the routes in route_subset; routes share no stops, buses or
+# passengers, so each subset can run in its own process
+def run_route(route_subset, seed=RANDOM_SEED):
+    state = SimState()
+    rng = np.random.default_rng(seed)
+    env = EventLoop()
     # Create stops
     stops_map = {}
-    for route in ROUTES.values():
+    for route in route_subset.values():
         for s in route["stops"]:
             stops_map[s] = Stop(env, s)
 
     # Start passenger generators
     for sname, lam in ARRIVAL_RATES.items():
-        for r in ROUTES.values():
+        for r in route_subset.values():
             if sname in r["stops"]:
-                env.process(passenger_generator(env, stops_map[sname], lam, r["stops"]))
+                PassengerSource(env, stops_map[sname], lam, r["stops"], rng)
                 break
 
     # Start buses
-    for route_name, rinfo in ROUTES.items():
+    for route_name, rinfo in route_subset.items():
         for i in range(rinfo["num_buses"]):
             start_offset = i*rinfo["headway"]/rinfo["num_buses"]
-            Bus(env, f"{route_name}-Bus-{i+1}", route_name, [stops_map[s] for s in rinfo["stops"]], rinfo, start_time=start_offset)
+            Bus(env, f"{route_name}-Bus-{i+1}", route_name, [stops_map[s] for s in rinfo["stops"]], rinfo, rng, state, start_time=start_offset)
 
     # Start monitor
-    env.process(monitor(env, stops_map))
+    Monitor(env, stops_map, state)
     env.run(until=SIM_TIME)
+    return state
+
+# Combine the states of runs over disjoint routes into one state
+def merge_states(results):
+    merged = SimState()
+    merged.waiting_times = np.concatenate([r.waiting_times[:r.wt_n] for r in results])
+    merged.wt_n = len(merged.waiting_times)
+    # Bus codes are per run, so shift each run's records past the buses already merged
+    parts, offset = [], 0
+    for r in results:
+        rec = r.records[:r.rec_n].copy()
+        rec["bus"] += offset
+        offset += len(r.bus_ids)
+        parts.append(rec)
+    merged.records = np.concatenate(parts)
+    merged.rec_n = sum(r.rec_n for r in results)
+    merged.bus_ids = sum((r.bus_ids for r in results), [])
+    merged.bus_routes = sum((r.bus_routes for r in results), [])
+    merged.bus_active = np.concatenate([r.bus_active for r in results])
+    merged.bus_occupied = np.concatenate([r.bus_occupied for r in results])
+    merged.bus_trips = np.concatenate([r.bus_trips for r in results])
+    for r in results:
+        # Each run only fills the rows of its own stops
+        merged.queue_lens += r.queue_lens
+        merged.served_per_stop += r.served_per_stop
+    return merged
+
+# Run every route, seeded seed + route index. Routes run in-process by default:
+# one route takes a few ms, less than starting a process pool. parallel=True
+# gives each route its own process, which only pays off for long horizons
+def run_simulation(seed=RANDOM_SEED, parallel=False):
+    subsets = [{name: info} for name, info in ROUTES.items()]
+    seeds = [seed + i for i in range(len(subsets))]
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(subsets)) as ex:
+            results = list(ex.map(run_route, subsets, seeds))
+    else:
+        results = [run_route(sub, rs) for sub, rs in zip(subsets, seeds)]
+    return merge_states(results)
+
+# One independent replication; routes run back to back since the replications
+# themselves are spread over the process pool
+def run_once(seed, replication_id):
+    route_seeds = seed.spawn(len(ROUTES))
+    results = [run_route({name: info}, rs) for (name, info), rs in zip(ROUTES.items(), route_seeds)]
+    merged = merge_states(results)
+    merged.replication = replication_id
+    return merged
+
+# Run n replications in parallel with statistically independent random streams
+def run_replications(n, base_seed=RANDOM_SEED):
+    seeds = np.random.SeedSequence(base_seed).spawn(n)
+    with ProcessPoolExecutor() as ex:
+        return list(ex.map(run_once, seeds, range(n)))
 
-    # -----------------------
-    # POST SIMULATION STATISTICS
-    # -----------------------
+# -----------------------
+# POST SIMULATION STATISTICS
+# -----------------------
+def report(state, plot=False):
     print("\n=== Simulation Complete ===\n")
 
     # Waiting time stats
-    total_passengers = len(metrics['passenger_records'])
-    avg_wait = np.mean(metrics['waiting_times'])
-    median_wait = np.median(metrics['waiting_times'])
-    max_wait = np.max(metrics['waiting_times'])
+    total_passengers = state.rec_n
+    wt = state.waiting_times[:state.wt_n]
+    avg_wait = np.mean(wt)
+    median_wait = np.median(wt)
+    max_wait = np.max(wt)
     print(f"Total passengers served: {total_passengers}")
     print(f"Average waiting time: {avg_wait:.2f} min")
     print(f"Median waiting time: {median_wait:.2f} min")
@@ -210,46 +428,46 @@ def run_simulation():
     # Served per stop table
     table1 = PrettyTable()
     table1.field_names = ["Stop", "Passengers Served"]
-    for stop, count in metrics["served_per_stop"].items():
-        table1.add_row([stop, count])
+    for i, stop in enumerate(STOP_NAMES):
+        table1.add_row([stop, state.served_per_stop[i]])
     print("Passengers Served Per Stop:")
     print(table1)
 
     # Bus summary table
     table2 = PrettyTable()
     table2.field_names = ["Bus ID", "Route", "Active min", "Occupied min", "Trips", "Avg Occupancy", "Utilization %"]
-    for bus, stat in metrics["bus_stats"].items():
-        avg_occ = stat["occupied_minutes"]/stat["active_minutes"] if stat["active_minutes"]>0 else 0
-        util = (stat["occupied_minutes"]/(stat["active_minutes"]*BUS_CAPACITY))*100 if stat["active_minutes"]>0 else 0
-        table2.add_row([bus, bus.split("-")[0], round(stat["active_minutes"],2), round(stat["occupied_minutes"],2),
-                        stat["trips_completed"], round(avg_occ,2), round(util,2)])
+    avg_occ, util = summarize_buses(state.bus_active, state.bus_occupied)
+    for i, (bus, route) in enumerate(zip(state.bus_ids, state.bus_routes)):
+        table2.add_row([bus, route, round(state.bus_active[i],2), round(state.bus_occupied[i],2),
+                        state.bus_trips[i], round(avg_occ[i],2), round(util[i],2)])
     print("\nBus Summary:")
     print(table2)
 
     # -----------------------
     # SAVE CSV FILES
     # -----------------------
-    pd.DataFrame(metrics["passenger_records"]).to_csv("passengers.csv", index=False)
-    pd.DataFrame([{**{"Bus":k}, **v} for k,v in metrics["bus_stats"].items()]).to_csv("buses.csv", index=False)
+    write_csv("passengers.csv", state.passenger_columns())
+    write_csv("buses.csv", {"Bus": state.bus_ids, "active_minutes": state.bus_active,
+                            "occupied_minutes": state.bus_occupied, "trips_completed": state.bus_trips})
 
-    # Queue CSV
-    queue_data = []
-    for stop, series in metrics["queue_time_series"].items():
-        for t, q in series:
-            queue_data.append({"Time":t, "Stop":stop, "Queue Length":q})
-    pd.DataFrame(queue_data).to_csv("queues.csv", index=False)
+    # Queue CSV (wide format: one row per minute, one column per stop)
+    np.savetxt("queues.csv", np.column_stack([state.queue_times, *state.queue_lens]), fmt="%d",
+               delimiter=",", header=",".join(["Time", *STOP_NAMES]), comments="")
 
     print("\nCSV files saved: passengers.csv, buses.csv, queues.csv\n")
 
     # -----------------------
     # PLOTS
     # -----------------------
+    # matplotlib is only imported when plots are requested, so batch runs never load it
+    if not plot:
+        return
+    import matplotlib.pyplot as plt
+
     # Queue lengths over time
     plt.figure(figsize=(10,5))
-    for stop, series in metrics["queue_time_series"].items():
-        times = [t for t,_ in series]
-        qlens = [q for _,q in series]
-        plt.plot(times, qlens, label=stop)
+    for stop, qlens in zip(STOP_NAMES, state.queue_lens):
+        plt.plot(state.queue_times, qlens, label=stop)
     plt.xlabel("Time (minutes)")
     plt.ylabel("Queue length")
     plt.title("Queue Lengths at Stops Over Time")
@@ -259,14 +477,48 @@ def run_simulation():
 
     # Waiting time histogram
     plt.figure(figsize=(8,4))
-    plt.hist(metrics["waiting_times"], bins=30, color="skyblue")
+    counts, edges = np.histogram(wt, bins=30)
+    plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color="skyblue")
     plt.xlabel("Waiting Time (min)")
     plt.ylabel("Frequency")
     plt.title("Passenger Waiting Time Distribution")
     plt.grid(True)
     plt.show()
 
+# Two-sided 95% Student-t quantiles t(0.975, df); df between entries falls back to the
+# next smaller df, which gives a slightly wider (conservative) interval
+T_975 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+         10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+         18: 2.101, 19: 2.093, 20: 2.086, 21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060,
+         26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+def t_quantile_975(df):
+    return T_975[max(k for k in T_975 if k <= df)]
+
+def report_replications(reps):
+    print(f"\n=== Replication Summary ({len(reps)} runs) ===\n")
+    table = PrettyTable()
+    table.field_names = ["Replication", "Passengers Served", "Avg Wait (min)", "Max Wait (min)"]
+    waits = [r.waiting_times[:r.wt_n] for r in reps]
+    avg_waits = np.array([np.mean(w) for w in waits])
+    for r, w, avg in zip(reps, waits, avg_waits):
+        table.add_row([r.replication, r.rec_n, round(avg,2), round(np.max(w),2)])
+    print(table)
+
+    # Pooled waiting times plus a 95% interval on the mean of the replication means
+    wt = np.concatenate(waits)
+    n = len(reps)
+    half_width = t_quantile_975(n-1) * avg_waits.std(ddof=1) / np.sqrt(n) if n > 1 else 0
+    print(f"Pooled average waiting time: {np.mean(wt):.2f} min over {len(wt)} passengers")
+    print(f"Mean of replication averages: {avg_waits.mean():.2f} ± {half_width:.2f} min (95% CI)\n")
+
 # -----------------------
 # RUN SIMULATION
 # -----------------------
-run_simulation()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Public transportation network simulation")
+    parser.add_argument("--plot", action="store_true", help="show queue length and waiting time plots")
+    parser.add_argument("--parallel", action="store_true", help="simulate each route in its own process")
+    args = parser.parse_args()
+    report(run_simulation(parallel=args.parallel), plot=args.plot)
+    report_replications(run_replications(NUM_REPLICATIONS))